@@ -6,13 +6,18 @@
 
 import os
 import sys
+import errno
 import shutil
 import threading
-import time
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 import hashlib
+import mmap
+import multiprocessing
+import sqlite3
 
 # GUI库 - 使用tkinter，Python标准库
 import tkinter as tk
@@ -37,6 +42,9 @@ FILE_CATEGORIES = {
     '其他': []  # 未分类文件
 }
 
+# 扩展名到分类的查找表，由 FILE_CATEGORIES 生成
+EXT_TO_CATEGORY = {ext: category for category, extensions in FILE_CATEGORIES.items() for ext in extensions}
+
 # 分类颜色配置
 CATEGORY_COLORS = {
     '图片': '#FF6B6B',
@@ -52,6 +60,127 @@ CATEGORY_COLORS = {
     '其他': '#E0E0E0'
 }
 
+def _brightness(hex_color):
+    """计算颜色亮度"""
+    hex_color = hex_color.lstrip('#')
+    r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    return (r * 299 + g * 587 + b * 114) / 1000
+
+# 各分类标签的文字颜色，根据背景亮度选择黑色或白色
+CATEGORY_FG = {category: 'black' if _brightness(color) > 128 else 'white'
+               for category, color in CATEGORY_COLORS.items()}
+
+# 查找重复文件使用的哈希算法（SHA-256 在现代 x86/ARM 上有硬件指令加速）
+HASH_ALGORITHM = 'sha256'
+# 计算哈希时每次读取的块大小（1 MiB），让工作线程尽量停留在释放GIL的C代码中
+HASH_CHUNK_SIZE = 1024 * 1024
+# 小于该大小的文件直接一次读入再计算哈希
+SMALL_FILE_SIZE = 64 * 1024
+# 不小于该大小的文件通过内存映射计算哈希
+MMAP_MIN_SIZE = 8 * 1024 * 1024
+# 查找重复文件时先只比较文件开头这么多字节的哈希
+HEAD_HASH_SIZE = 64 * 1024
+# 待计算哈希的文件达到该数量时改用进程池，否则进程启动开销得不偿失
+PROCESS_POOL_MIN_FILES = 1000
+# Windows 上进程池最多只能有61个工作进程
+PROCESS_POOL_MAX_WORKERS = 61
+# 文件哈希缓存数据库
+HASH_CACHE_PATH = Path.home() / ".cache" / "file_organizer" / "hashes.sqlite"
+
+def calculate_hash(filepath, algorithm=HASH_ALGORITHM, limit=None):
+    """
+    计算文件（或其前 limit 个字节）的哈希值，返回 (路径, 哈希值)，读取失败时哈希值为 None
+    
+    定义在模块级别，以便交给进程池执行
+    """
+    try:
+        with open(filepath, "rb") as f:
+            if limit is not None:
+                return filepath, hashlib.new(algorithm, f.read(limit)).hexdigest()
+            
+            size = os.fstat(f.fileno()).st_size
+            if size < SMALL_FILE_SIZE:
+                # 小文件一次读完，省去分块更新摘要的开销
+                return filepath, hashlib.new(algorithm, f.read()).hexdigest()
+            if size >= MMAP_MIN_SIZE:
+                # 大文件映射到内存后整块交给哈希函数，由内核按需读入，没有Python层的循环
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return filepath, hashlib.new(algorithm, mm).hexdigest()
+                except (OSError, ValueError):
+                    pass  # 无法映射（如32位系统上的超大文件）时退回分块读取
+            if hasattr(hashlib, 'file_digest'):
+                # Python 3.11+ 在C层完成读取循环
+                return filepath, hashlib.file_digest(f, algorithm).hexdigest()
+            file_hash = hashlib.new(algorithm)
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+            return filepath, file_hash.hexdigest()
+    except Exception:
+        return filepath, None
+
+class HashCache:
+    """以 (路径, 大小, 修改时间) 为依据缓存文件头哈希和完整哈希，重复扫描时未变化的文件无需再次读取"""
+
+    def __init__(self, db_path=HASH_CACHE_PATH, batch_size=1000):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS files (
+                                 path TEXT PRIMARY KEY,
+                                 size INTEGER,
+                                 mtime REAL,
+                                 algorithm TEXT,
+                                 digest TEXT,
+                                 head_digest TEXT)""")
+        # 旧版本建的表没有文件头哈希这一列
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        if 'head_digest' not in columns:
+            self.conn.execute("ALTER TABLE files ADD COLUMN head_digest TEXT")
+        self.batch_size = batch_size
+        self.pending = {'digest': [], 'head_digest': []}
+
+    def get(self, path, size, mtime, algorithm, head=False):
+        """返回缓存的哈希值（head 为 True 时返回文件头哈希），文件已变化或没有缓存时返回 None"""
+        column = 'head_digest' if head else 'digest'
+        row = self.conn.execute(
+            f"SELECT {column} FROM files WHERE path=? AND size=? AND mtime=? AND algorithm=?",
+            (path, size, mtime, algorithm)).fetchone()
+        return row[0] if row else None
+
+    def put(self, path, size, mtime, algorithm, digest, head=False):
+        """记录文件哈希，每攒够一批再在一个事务里写入"""
+        self.pending['head_digest' if head else 'digest'].append((path, size, mtime, algorithm, digest))
+        if sum(map(len, self.pending.values())) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """写入尚未保存的记录"""
+        if not any(self.pending.values()):
+            return
+        with self.conn:
+            for column, other in (('head_digest', 'digest'), ('digest', 'head_digest')):
+                if self.pending[column]:
+                    # 只更新这一种哈希；文件已变化时另一种哈希作废
+                    self.conn.executemany(
+                        f"""INSERT INTO files (path, size, mtime, algorithm, {column})
+                            VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(path) DO UPDATE SET
+                                {other} = CASE WHEN size = excluded.size AND mtime = excluded.mtime
+                                               AND algorithm = excluded.algorithm
+                                          THEN {other} END,
+                                {column} = excluded.{column},
+                                size = excluded.size,
+                                mtime = excluded.mtime,
+                                algorithm = excluded.algorithm""",
+                        self.pending[column])
+        self.pending = {'digest': [], 'head_digest': []}
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
 class FileOrganizerGUI:
     def __init__(self, root):
         self.root = root
@@ -66,10 +195,18 @@ class FileOrganizerGUI:
         self.dest_dir = tk.StringVar(value=str(Path.home() / "Downloads" / "已整理"))
         self.org_mode = tk.StringVar(value="type")
         self.create_backup = tk.BooleanVar(value=True)
+        self.hardlink_backup = tk.BooleanVar(value=False)
         self.dry_run = tk.BooleanVar(value=False)
         self.thread_running = False
+        self.scanning = False
+        self.scan_failed = False
         self.log_queue = queue.Queue()
+        # 有界队列：界面来不及显示时扫描线程会阻塞等待
+        self.scan_queue = queue.Queue(maxsize=2000)
+        self.progress_queue = queue.Queue()
         self.files_to_process = []
+        self.category_items = {}  # 分类 -> (色块图元, 文字图元)
+        self.category_counts = defaultdict(int)  # 扫描过程中累计的各分类文件数
         self.stats = defaultdict(int)
         
         # 设置样式
@@ -81,6 +218,10 @@ class FileOrganizerGUI:
         # 启动日志更新定时器
         self.update_log()
         
+        # 启动文件列表和进度条更新定时器
+        self._drain_scan_queue()
+        self._pump_progress()
+        
         # 加载示例图片
         self.load_sample_images()
 
@@ -178,6 +319,7 @@ class FileOrganizerGUI:
         # 额外选项
         ttk.Checkbutton(options_frame, text="创建备份", variable=self.create_backup).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=5)
         ttk.Checkbutton(options_frame, text="模拟运行（不实际移动文件）", variable=self.dry_run).grid(row=1, column=2, columnspan=2, sticky=tk.W, pady=5)
+        ttk.Checkbutton(options_frame, text="硬链接备份（几乎瞬间完成，但备份与原文件共享内容）", variable=self.hardlink_backup).grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=5)
         
         # 文件预览区域
         preview_frame = ttk.LabelFrame(basic_frame, text="文件预览", padding="10")
@@ -214,12 +356,9 @@ class FileOrganizerGUI:
         category_frame.rowconfigure(0, weight=1)
         category_frame.columnconfigure(0, weight=1)
         
-        # 分类标签容器
+        # 分类标签画布（分类色块直接绘制在画布上）
         self.category_canvas = tk.Canvas(category_frame, bg='white', height=250)
         self.category_scrollbar = ttk.Scrollbar(category_frame, orient=tk.VERTICAL, command=self.category_canvas.yview)
-        self.category_frame = ttk.Frame(self.category_canvas)
-        
-        self.category_canvas.create_window((0, 0), window=self.category_frame, anchor=tk.NW)
         self.category_canvas.configure(yscrollcommand=self.category_scrollbar.set)
         
         # 布局
@@ -251,11 +390,15 @@ class FileOrganizerGUI:
         ttk.Label(dup_frame, text="查找方式:").grid(row=0, column=0, sticky=tk.W, pady=5)
         self.dup_method = tk.StringVar(value="name_size")
         ttk.Radiobutton(dup_frame, text="文件名+大小", variable=self.dup_method, value="name_size").grid(row=0, column=1, sticky=tk.W)
-        ttk.Radiobutton(dup_frame, text="文件内容(MD5)", variable=self.dup_method, value="content").grid(row=0, column=2, sticky=tk.W)
+        ttk.Radiobutton(dup_frame, text="文件内容(SHA-256)", variable=self.dup_method, value="content").grid(row=0, column=2, sticky=tk.W)
+        
+        ttk.Label(dup_frame, text="并发数:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.max_concurrency = tk.IntVar(value=8)
+        ttk.Spinbox(dup_frame, from_=1, to=64, textvariable=self.max_concurrency, width=10).grid(row=1, column=1, sticky=tk.W, padx=5)
         
         ttk.Button(dup_frame, text="🔍 开始查找", 
                   command=self.find_duplicates,
-                  style='Warning.TButton').grid(row=1, column=0, columnspan=3, pady=10)
+                  style='Warning.TButton').grid(row=2, column=0, columnspan=3, pady=10)
         
         # 空文件夹清理
         cleanup_frame = ttk.LabelFrame(advanced_frame, text="空文件夹清理", padding="10")
@@ -368,8 +511,11 @@ class FileOrganizerGUI:
         # 清空现有文件列表
         self.file_tree.delete(*self.file_tree.get_children())
         self.files_to_process = []
+        self.category_counts = defaultdict(int)
         
         # 更新状态
+        self.scanning = True
+        self.scan_failed = False
         self.status_label.config(text="正在扫描目录...")
         self.progress_var.set(0)
         
@@ -383,46 +529,67 @@ class FileOrganizerGUI:
             max_files = 1000  # 限制显示的文件数量
             
             # 遍历目录
-            for item in source_path.rglob('*'):
-                if item.is_file():
-                    if file_count >= max_files:
-                        self.log_message(f"已显示 {max_files} 个文件，停止扫描更多文件")
-                        break
-                    
-                    # 获取文件信息
-                    file_info = {
-                        'path': item,
-                        'name': item.name,
-                        'size': self.format_file_size(item.stat().st_size),
-                        'modified': datetime.fromtimestamp(item.stat().st_mtime).strftime('%Y-%m-%d %H:%M'),
-                        'category': self.get_file_category(item.suffix)
-                    }
-                    
-                    self.files_to_process.append(file_info)
-                    file_count += 1
-                    
-                    # 每100个文件更新一次UI
-                    if file_count % 100 == 0:
-                        self.root.after(0, self._update_file_tree, file_count)
-                        time.sleep(0.01)  # 防止UI卡死
-            
-            # 最终更新UI
-            self.root.after(0, self._update_file_tree, file_count)
-            self.root.after(0, self._update_category_preview)
+            for entry in self._walk(source_path):
+                if file_count >= max_files:
+                    self.log_message(f"已显示 {max_files} 个文件，停止扫描更多文件")
+                    break
+                
+                # 获取文件信息
+                st = entry.stat(follow_symlinks=False)
+                file_info = {
+                    'path': Path(entry.path),
+                    'name': entry.name,
+                    'size_bytes': st.st_size,
+                    'mtime': st.st_mtime,
+                    'size': self.format_file_size(st.st_size),
+                    'modified': datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M'),
+                    'category': self.get_file_category(os.path.splitext(entry.name)[1])
+                }
+                
+                self.scan_queue.put(file_info)
+                file_count += 1
             
             self.log_message(f"扫描完成，找到 {file_count} 个文件")
-            self.root.after(0, lambda: self.status_label.config(text="扫描完成"))
             
         except Exception as e:
             self.log_message(f"扫描目录时出错: {e}")
-            self.root.after(0, lambda: self.status_label.config(text="扫描出错"))
+            self.scan_failed = True
+        finally:
+            # 无论成功与否都通知界面扫描结束，由界面线程在显示完已扫描的文件后更新分类预览和状态
+            self.scan_queue.put(None)
 
-    def _update_file_tree(self, file_count):
-        """更新文件树显示"""
-        # 只显示最新的文件
-        start_index = max(0, len(self.files_to_process) - 100)
+    def _walk(self, root):
+        """用 os.scandir 递归遍历目录，逐个产出普通文件的 DirEntry（其 stat 结果会被缓存）"""
+        try:
+            with os.scandir(root) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from self._walk(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except OSError as e:
+            self.log_message(f"无法访问 {root}: {e}")
+
+    def _drain_scan_queue(self):
+        """取出扫描线程送来的文件，加入待处理列表并批量插入文件列表"""
+        items = []
+        try:
+            # 每次最多处理500个，避免一次占用UI线程太久
+            while len(items) < 500:
+                items.append(self.scan_queue.get_nowait())
+        except queue.Empty:
+            pass
         
-        for file_info in self.files_to_process[start_index:]:
+        for file_info in items:
+            if file_info is None:
+                # 扫描结束
+                self.scanning = False
+                self._update_category_preview()
+                self.status_label.config(text="扫描出错" if self.scan_failed else "扫描完成")
+                continue
+            
+            self.files_to_process.append(file_info)
+            self.category_counts[file_info['category']] += 1
             self.file_tree.insert('', 'end', values=(
                 file_info['name'],
                 file_info['category'],
@@ -430,47 +597,61 @@ class FileOrganizerGUI:
                 file_info['modified']
             ))
         
-        self.progress_var.set(min(100, file_count / 10))
+        if items:
+            self.progress_var.set(min(100, len(self.files_to_process) / 10))
+        
+        # 每50毫秒检查一次
+        self.root.after(50, self._drain_scan_queue)
 
-    def _update_category_preview(self):
-        """更新分类预览"""
-        # 清空现有分类预览
-        for widget in self.category_frame.winfo_children():
-            widget.destroy()
+    def _pump_progress(self):
+        """把工作线程送来的最新进度更新到进度条"""
+        progress = None
+        try:
+            while True:
+                progress = self.progress_queue.get_nowait()
+        except queue.Empty:
+            pass
         
-        # 统计各分类文件数量
-        category_counts = defaultdict(int)
-        for file_info in self.files_to_process:
-            category_counts[file_info['category']] += 1
+        if progress is not None:
+            self.progress_var.set(progress)
         
-        # 显示分类标签
-        row = 0
-        for category, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True):
-            color = CATEGORY_COLORS.get(category, '#E0E0E0')
+        # 每100毫秒检查一次
+        self.root.after(100, self._pump_progress)
+
+    def _update_category_preview(self):
+        """更新分类预览，各分类数量在扫描时已经累计好，扫描结束时只绘制一次"""
+        # 绘制分类标签：每个分类一个色块加一段文字，画布图元比Label控件轻量得多
+        # 已有的分类只更新文字和位置，新出现的分类才创建图元，消失的分类删除图元
+        seen = set()
+        y = 2
+        for category, count in sorted(self.category_counts.items(), key=lambda x: x[1], reverse=True):
+            seen.add(category)
+            text = f"{category}: {count} 个文件"
+            
+            if category in self.category_items:
+                rect_id, text_id = self.category_items[category]
+                self.category_canvas.itemconfig(text_id, text=text)
+                self.category_canvas.coords(text_id, 14, y + 15)
+            else:
+                text_id = self.category_canvas.create_text(
+                    14, y + 15, text=text, anchor=tk.W,
+                    fill=CATEGORY_FG.get(category, 'black'),
+                    font=('微软雅黑', 10))
+                rect_id = self.category_canvas.create_rectangle(
+                    0, 0, 0, 0, fill=CATEGORY_COLORS.get(category, '#E0E0E0'), outline='gray')
+                self.category_canvas.tag_lower(rect_id, text_id)
+                self.category_items[category] = (rect_id, text_id)
             
-            # 创建分类标签
-            category_label = tk.Label(self.category_frame, 
-                                     text=f"{category}: {count} 个文件",
-                                     bg=color,
-                                     fg='black' if self.get_brightness(color) > 128 else 'white',
-                                     font=('微软雅黑', 10),
-                                     padx=10,
-                                     pady=5,
-                                     relief=tk.RAISED,
-                                     borderwidth=2)
-            category_label.grid(row=row, column=0, sticky=tk.W, pady=2, padx=2)
-            row += 1
+            text_right = self.category_canvas.bbox(text_id)[2]
+            self.category_canvas.coords(rect_id, 2, y, text_right + 12, y + 30)
+            y += 34
+        
+        for category in set(self.category_items) - seen:
+            self.category_canvas.delete(*self.category_items.pop(category))
         
         # 更新画布滚动区域
-        self.category_frame.update_idletasks()
         self.category_canvas.configure(scrollregion=self.category_canvas.bbox("all"))
 
-    def get_brightness(self, hex_color):
-        """计算颜色亮度"""
-        hex_color = hex_color.lstrip('#')
-        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        return (r * 299 + g * 587 + b * 114) / 1000
-
     def format_file_size(self, size_bytes):
         """格式化文件大小"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -481,11 +662,7 @@ class FileOrganizerGUI:
 
     def get_file_category(self, extension):
         """根据扩展名获取文件分类"""
-        extension = extension.lower()
-        for category, extensions in FILE_CATEGORIES.items():
-            if extension in extensions:
-                return category
-        return '其他'
+        return EXT_TO_CATEGORY.get(extension.lower(), '其他')
 
     def start_organize(self):
         """开始整理文件"""
@@ -515,63 +692,58 @@ class FileOrganizerGUI:
             if self.create_backup.get() and not self.dry_run.get():
                 backup_path = source_path.parent / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 self.log_message(f"创建备份: {backup_path}")
-                shutil.copytree(source_path, backup_path)
+                copy_function = self._link_or_copy if self.hardlink_backup.get() else self._reflink_or_copy
+                shutil.copytree(source_path, backup_path, copy_function=copy_function)
             
             total = len(self.files_to_process)
             processed = 0
             
-            for file_info in self.files_to_process:
-                try:
-                    if self.org_mode.get() == 'date':
-                        # 按日期整理
-                        file_date = datetime.fromtimestamp(file_info['path'].stat().st_mtime)
-                        folder_name = file_date.strftime("%Y-%m")
-                        target_dir = dest_path / folder_name
-                    elif self.org_mode.get() == 'size':
-                        # 按大小整理
-                        size = file_info['path'].stat().st_size
-                        if size < 1024 * 1024:  # < 1MB
-                            folder_name = "小于1MB"
-                        elif size < 1024 * 1024 * 10:  # < 10MB
-                            folder_name = "1MB-10MB"
-                        elif size < 1024 * 1024 * 100:  # < 100MB
-                            folder_name = "10MB-100MB"
-                        else:
-                            folder_name = "大于100MB"
-                        target_dir = dest_path / folder_name
-                    else:
-                        # 按类型整理
-                        target_dir = dest_path / file_info['category']
-                    
-                    if not self.dry_run.get():
+            # 源目录和目标目录在同一文件系统时可以直接重命名
+            same_device = (not self.dry_run.get() and
+                           os.stat(source_path).st_dev == os.stat(dest_path).st_dev)
+            # 每个 (目录, 基础名, 扩展名) 下一个可能空闲的编号，避免每次冲突都从1开始探测
+            next_free = defaultdict(lambda: 1)
+            
+            # 先算出每个文件的目标目录，并把用到的目录一次性创建好
+            org_mode = self.org_mode.get()
+            target_dirs = [self._target_dir_for(file_info, dest_path, org_mode)
+                           for file_info in self.files_to_process]
+            if not self.dry_run.get():
+                for target_dir in set(target_dirs):
+                    try:
                         target_dir.mkdir(parents=True, exist_ok=True)
-                    
+                    except Exception as e:
+                        self.log_message(f"✗ 无法创建目录 {target_dir}: {e}")
+            
+            for file_info, target_dir in zip(self.files_to_process, target_dirs):
+                try:
                     # 移动文件
                     target_file = target_dir / file_info['path'].name
                     
                     if not self.dry_run.get():
                         # 处理文件名冲突
-                        counter = 1
-                        while target_file.exists():
+                        if target_file.exists():
                             name_parts = file_info['path'].stem.split('_')
                             if len(name_parts) > 1 and name_parts[-1].isdigit():
                                 base_name = '_'.join(name_parts[:-1])
                             else:
                                 base_name = file_info['path'].stem
-                            new_name = f"{base_name}_{counter}{file_info['path'].suffix}"
-                            target_file = target_dir / new_name
-                            counter += 1
+                            suffix = file_info['path'].suffix
+                            key = (target_dir, base_name, suffix)
+                            counter = next_free[key]
+                            target_file = target_dir / f"{base_name}_{counter}{suffix}"
+                            while target_file.exists():
+                                counter += 1
+                                target_file = target_dir / f"{base_name}_{counter}{suffix}"
+                            next_free[key] = counter + 1
                         
-                        shutil.move(str(file_info['path']), str(target_file))
+                        self._move_file(file_info['path'], target_file, same_device)
                         self.log_message(f"✓ 移动: {file_info['name']} -> {target_dir.name}/")
                     else:
                         self.log_message(f"[模拟] 移动: {file_info['name']} -> {target_dir.name}/")
                     
                     processed += 1
-                    progress = (processed / total) * 100
-                    self.root.after(0, lambda p=progress: self.progress_var.set(p))
-                    
-                    time.sleep(0.01)  # 防止UI卡死
+                    self.progress_queue.put((processed / total) * 100)
                     
                 except Exception as e:
                     self.log_message(f"✗ 错误: {file_info['name']} - {e}")
@@ -584,6 +756,70 @@ class FileOrganizerGUI:
         finally:
             self.thread_running = False
 
+    def _target_dir_for(self, file_info, dest_path, org_mode):
+        """根据整理方式确定文件的目标目录"""
+        if org_mode == 'date':
+            # 按日期整理
+            file_date = datetime.fromtimestamp(file_info['mtime'])
+            return dest_path / file_date.strftime("%Y-%m")
+        
+        if org_mode == 'size':
+            # 按大小整理
+            size = file_info['size_bytes']
+            if size < 1024 * 1024:  # < 1MB
+                folder_name = "小于1MB"
+            elif size < 1024 * 1024 * 10:  # < 10MB
+                folder_name = "1MB-10MB"
+            elif size < 1024 * 1024 * 100:  # < 100MB
+                folder_name = "10MB-100MB"
+            else:
+                folder_name = "大于100MB"
+            return dest_path / folder_name
+        
+        # 按类型整理
+        return dest_path / file_info['category']
+
+    def _reflink_or_copy(self, src, dst):
+        """
+        复制单个文件用于备份
+        
+        优先使用 os.copy_file_range，在同一 btrfs/xfs 文件系统上内核会直接创建写时复制的引用，
+        不支持时退回 shutil.copy2
+        """
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+        except (AttributeError, OSError):
+            # 非Linux系统没有 os.copy_file_range，或者文件系统不支持
+            shutil.copy2(src, dst)
+        return dst
+
+    def _link_or_copy(self, src, dst):
+        """为单个文件创建硬链接用于备份，无法链接（如跨文件系统）时退回复制"""
+        try:
+            os.link(src, dst)
+        except OSError:
+            self._reflink_or_copy(src, dst)
+        return dst
+
+    def _move_file(self, src, dst, same_device):
+        """移动文件，同一文件系统内直接用 os.replace，否则交给 shutil.move"""
+        if same_device:
+            try:
+                os.replace(src, dst)
+                return
+            except OSError as e:
+                # 源目录下挂载了其他文件系统的子目录
+                if e.errno != errno.EXDEV:
+                    raise
+        shutil.move(str(src), str(dst))
+
     def find_duplicates(self):
         """查找重复文件"""
         source_path = Path(self.source_dir.get())
@@ -623,45 +859,91 @@ class FileOrganizerGUI:
         file_dict = {}
         duplicates = {}
         
-        for item in directory.rglob('*'):
-            if item.is_file():
-                key = (item.name.lower(), item.stat().st_size)
-                if key in file_dict:
-                    if file_dict[key] not in duplicates:
-                        duplicates[file_dict[key]] = []
-                    duplicates[file_dict[key]].append(str(item))
-                else:
-                    file_dict[key] = str(item)
+        for entry in self._walk(directory):
+            key = (entry.name.lower(), entry.stat(follow_symlinks=False).st_size)
+            if key in file_dict:
+                duplicates.setdefault(file_dict[key], []).append(entry.path)
+            else:
+                file_dict[key] = entry.path
         
         return duplicates
 
-    def find_duplicates_by_content(self, directory):
-        """通过文件内容(MD5)查找重复文件"""
-        file_hashes = {}
-        duplicates = {}
+    def find_duplicates_by_content(self, directory, algorithm=HASH_ALGORITHM):
+        """通过文件内容哈希查找重复文件（依次按大小、文件头哈希、完整哈希分组）"""
+        # 第一步：按文件大小分组，大小唯一的文件不可能重复
+        size_groups = defaultdict(list)
+        file_stats = {}  # 路径 -> (inode, 大小, 修改时间)
+        for entry in self._walk(directory):
+            st = entry.stat(follow_symlinks=False)
+            size_groups[st.st_size].append(entry.path)
+            file_stats[entry.path] = (entry.inode(), st.st_size, st.st_mtime)
+        size_groups = {size: items for size, items in size_groups.items() if len(items) > 1}
+        
+        # 未变化的文件直接使用缓存中的文件头哈希和完整哈希
+        try:
+            cache = HashCache()
+        except (OSError, sqlite3.Error) as e:
+            self.log_message(f"无法打开哈希缓存，将重新计算所有哈希: {e}")
+            cache = None
         
-        for item in directory.rglob('*'):
-            if item.is_file():
-                try:
-                    file_hash = self.calculate_md5(item)
-                    if file_hash in file_hashes:
-                        if file_hashes[file_hash] not in duplicates:
-                            duplicates[file_hashes[file_hash]] = []
-                        duplicates[file_hashes[file_hash]].append(str(item))
-                    else:
-                        file_hashes[file_hash] = str(item)
-                except Exception as e:
-                    self.log_message(f"计算文件哈希时出错 {item}: {e}")
+        try:
+            # 第二步：大小相同的文件只比较开头部分的哈希
+            head_groups = self._refine_groups(size_groups, algorithm, file_stats, HEAD_HASH_SIZE, cache=cache)
+            
+            # 第三步：文件头仍然相同的才计算完整哈希（文件头已覆盖整个文件的除外）
+            full_groups = {key: items for key, items in head_groups.items() if key[0] <= HEAD_HASH_SIZE}
+            full_groups.update(self._refine_groups(
+                {key: items for key, items in head_groups.items() if key[0] > HEAD_HASH_SIZE},
+                algorithm, file_stats, cache=cache))
+        finally:
+            if cache:
+                cache.close()
+        
+        duplicates = {}
+        for items in full_groups.values():
+            duplicates[items[0]] = items[1:]
         
         return duplicates
 
-    def calculate_md5(self, filepath):
-        """计算文件的MD5哈希值"""
-        hash_md5 = hashlib.md5()
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+    def _refine_groups(self, groups, algorithm, file_stats, limit=None, cache=None):
+        """在每个分组内按文件哈希继续细分，只保留仍有多个文件的分组"""
+        group_keys = {item: key for key, items in groups.items() for item in items}
+        refined = defaultdict(list)
+        
+        head = limit is not None
+        
+        # 按 inode 顺序读取文件，机械硬盘上可以大幅减少寻道
+        paths = []
+        for item in sorted(group_keys, key=lambda path: file_stats[path][0]):
+            file_hash = cache.get(item, *file_stats[item][1:], algorithm, head=head) if cache else None
+            if file_hash is None:
+                paths.append(item)
+            else:
+                refined[(group_keys[item], file_hash)].append(item)
+        
+        if len(paths) < PROCESS_POOL_MIN_FILES:
+            # 文件较少时用线程池即可，哈希计算和文件读取都会释放GIL
+            executor = ThreadPoolExecutor(max_workers=self.max_concurrency.get())
+        else:
+            # 文件较多时用进程池，每个进程有独立的GIL，大量小文件的哈希也能真正并行；
+            # 进程数同样受“并发数”设置限制，超过CPU核数没有意义。
+            # 当前进程运行着Tk和多个线程，fork 出的子进程可能死锁，因此统一用 spawn 启动
+            workers = min(self.max_concurrency.get(), os.cpu_count() or 1, PROCESS_POOL_MAX_WORKERS)
+            executor = ProcessPoolExecutor(max_workers=workers,
+                                           mp_context=multiprocessing.get_context('spawn'))
+        
+        # 工作线程/进程只负责读文件和计算哈希，分组字典只在当前线程读写，无需加锁
+        with executor:
+            hasher = partial(calculate_hash, algorithm=algorithm, limit=limit)
+            for item, file_hash in executor.map(hasher, paths, chunksize=64):
+                if file_hash is None:
+                    self.log_message(f"计算文件哈希时出错，已跳过: {item}")
+                else:
+                    refined[(group_keys[item], file_hash)].append(item)
+                    if cache:
+                        cache.put(item, *file_stats[item][1:], algorithm, file_hash, head=head)
+        
+        return {key: items for key, items in refined.items() if len(items) > 1}
 
     def cleanup_empty_folders(self):
         """清理空文件夹"""
@@ -677,15 +959,16 @@ class FileOrganizerGUI:
         """清理空文件夹的线程函数"""
         try:
             empty_folders = []
+            empty = set()
+            root_dir = os.fspath(source_path)
             
-            for root, dirs, files in os.walk(source_path, topdown=False):
-                for dir_name in dirs:
-                    dir_path = Path(root) / dir_name
-                    try:
-                        if not any(dir_path.iterdir()):
-                            empty_folders.append(str(dir_path))
-                    except Exception as e:
-                        self.log_message(f"无法访问 {dir_path}: {e}")
+            # 自底向上遍历：没有文件且所有子目录都为空的目录即为空目录，无需再逐个列出目录内容
+            for root, dirs, files in os.walk(root_dir, topdown=False,
+                                             onerror=lambda e: self.log_message(f"无法访问 {e.filename}: {e}")):
+                if not files and all(os.path.join(root, d) in empty for d in dirs):
+                    empty.add(root)
+                    if root != root_dir:
+                        empty_folders.append(root)
             
             if empty_folders:
                 self.log_message(f"\n找到 {len(empty_folders)} 个空文件夹:")
@@ -695,7 +978,7 @@ class FileOrganizerGUI:
                 if not self.cleanup_preview.get():
                     for folder in empty_folders:
                         try:
-                            Path(folder).rmdir()
+                            os.rmdir(folder)
                             self.log_message(f"✓ 删除: {folder}")
                         except Exception as e:
                             self.log_message(f"✗ 删除失败 {folder}: {e}")
@@ -724,34 +1007,64 @@ class FileOrganizerGUI:
             pattern = self.rename_pattern.get()
             start_num = self.start_num.get()
             
+            # 先用第一个文件检查一次命名规则，避免规则写错时每个文件都报一遍错；
+            # 只有未知字段和格式错误才算规则无效，下标越界等与具体文件名有关的错误留给逐个文件处理
+            sample = self.files_to_process[0]['path'] if self.files_to_process else Path('')
+            try:
+                pattern.format(num=start_num, name=sample.stem, ext=sample.suffix)
+            except IndexError:
+                pass
+            except (KeyError, ValueError) as e:
+                self.log_message(f"命名规则无效: {pattern} - {e}")
+                return
+            format_name = pattern.format
+            
+            # 先按顺序算出所有新文件名
+            jobs = []
             for i, file_info in enumerate(self.files_to_process):
                 try:
                     old_path = file_info['path']
-                    new_name = pattern.format(
+                    new_name = format_name(
                         num=start_num + i,
                         name=old_path.stem,
                         ext=old_path.suffix
                     )
-                    
-                    new_path = old_path.parent / new_name
-                    
-                    if not self.dry_run.get():
-                        old_path.rename(new_path)
-                        self.log_message(f"✓ 重命名: {old_path.name} -> {new_name}")
-                    else:
-                        self.log_message(f"[模拟] 重命名: {old_path.name} -> {new_name}")
-                    
-                    time.sleep(0.01)
-                    
+                    jobs.append((old_path, old_path.parent / new_name))
                 except Exception as e:
                     self.log_message(f"✗ 重命名失败 {file_info['name']}: {e}")
             
+            if self.dry_run.get():
+                for old_path, new_path in jobs:
+                    self.log_message(f"[模拟] 重命名: {old_path.name} -> {new_path.name}")
+            else:
+                # 新文件名与其他文件当前的名字重叠（或目标已存在）、或多个文件改成同一个名字时，
+                # 并发执行可能在某个文件改名之前就把它覆盖掉，结果也不确定，这种情况只能按原顺序逐个重命名
+                sources = {old_path for old_path, _ in jobs}
+                if (len({new_path for _, new_path in jobs}) != len(jobs) or
+                        any(new_path in sources or os.path.lexists(new_path) for _, new_path in jobs)):
+                    messages = [self._do_rename(job) for job in jobs]
+                else:
+                    # 重命名是阻塞的系统调用且会释放GIL，在慢速或网络文件系统上并发执行可以重叠等待时间
+                    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+                        messages = list(executor.map(self._do_rename, jobs))
+                for message in messages:
+                    self.log_message(message)
+            
             self.log_message("\n批量重命名完成")
             self.root.after(0, lambda: self.status_label.config(text="重命名完成"))
             
         except Exception as e:
             self.log_message(f"批量重命名时出错: {e}")
 
+    def _do_rename(self, job):
+        """执行单个重命名，返回对应的日志消息"""
+        old_path, new_path = job
+        try:
+            os.rename(old_path, new_path)
+            return f"✓ 重命名: {old_path.name} -> {new_path.name}"
+        except Exception as e:
+            return f"✗ 重命名失败 {old_path.name}: {e}"
+
     def generate_stats(self):
         """生成文件统计"""
         if not self.files_to_process:
@@ -760,13 +1073,18 @@ class FileOrganizerGUI:
         
         # 统计文件信息
         total_size = 0
-        category_stats = defaultdict(lambda: {'count': 0, 'size': 0})
+        category_stats = {}  # 分类 -> [文件数, 总大小]
         
+        # 文件大小在扫描时已经记录，这里不必再逐个 stat
         for file_info in self.files_to_process:
-            size = file_info['path'].stat().st_size
+            size = file_info['size_bytes']
             total_size += size
-            category_stats[file_info['category']]['count'] += 1
-            category_stats[file_info['category']]['size'] += size
+            entry = category_stats.get(file_info['category'])
+            if entry is None:
+                category_stats[file_info['category']] = [1, size]
+            else:
+                entry[0] += 1
+                entry[1] += size
         
         # 更新详细信息
         self.details_text.delete(1.0, tk.END)
@@ -777,11 +1095,11 @@ class FileOrganizerGUI:
         self.details_text.insert(tk.END, f"总大小: {self.format_file_size(total_size)}\n\n")
         
         self.details_text.insert(tk.END, "按类型统计:\n")
-        for category, stats in sorted(category_stats.items(), key=lambda x: x[1]['count'], reverse=True):
-            percentage = (stats['count'] / len(self.files_to_process)) * 100
+        for category, (count, size) in sorted(category_stats.items(), key=lambda x: x[1][0], reverse=True):
+            percentage = (count / len(self.files_to_process)) * 100
             self.details_text.insert(tk.END, 
-                f"  {category}: {stats['count']} 个文件 ({percentage:.1f}%), "
-                f"大小: {self.format_file_size(stats['size'])}\n")
+                f"  {category}: {count} 个文件 ({percentage:.1f}%), "
+                f"大小: {self.format_file_size(size)}\n")
         
         # 绘制统计图
         self.draw_stats_chart(category_stats)
@@ -809,32 +1127,36 @@ class FileOrganizerGUI:
         self.stats_canvas.create_line(margin, margin, margin, canvas_height - margin, width=2)
         
         # 获取数据
-        categories = list(category_stats.keys())
-        counts = [stats['count'] for stats in category_stats.values()]
-        max_count = max(counts) if counts else 1
-        
-        # 绘制柱状图
-        bar_width = chart_width / len(categories) * 0.7
-        gap = chart_width / len(categories) * 0.3
-        
-        for i, (category, count) in enumerate(zip(categories, counts)):
-            x0 = margin + gap/2 + i * (bar_width + gap)
-            y0 = canvas_height - margin
-            bar_height = (count / max_count) * chart_height
-            y1 = y0 - bar_height
-            
-            color = CATEGORY_COLORS.get(category, '#E0E0E0')
-            
-            # 绘制柱状
-            self.stats_canvas.create_rectangle(x0, y0, x0 + bar_width, y1, fill=color, outline='black')
-            
-            # 绘制数量标签
-            self.stats_canvas.create_text(x0 + bar_width/2, y1 - 10, 
-                                         text=str(count), font=('微软雅黑', 9, 'bold'))
-            
-            # 绘制分类标签（旋转45度）
-            self.stats_canvas.create_text(x0 + bar_width/2, canvas_height - margin + 15, 
-                                         text=category, angle=45, font=('微软雅黑', 8))
+        counts = [count for count, size in category_stats.values()]
+        max_count = max(counts) or 1
+        
+        # 先算好所有柱子的坐标和颜色，数量为0的分类不画
+        slot = chart_width / len(counts)
+        bar_width = slot * 0.7
+        gap = slot * 0.3
+        y0 = canvas_height - margin
+        bars = []
+        for i, (category, count) in enumerate(zip(category_stats, counts)):
+            if count == 0:
+                continue
+            x0 = margin + gap/2 + i * slot
+            y1 = y0 - (count / max_count) * chart_height
+            bars.append((x0, y1, CATEGORY_COLORS.get(category, '#E0E0E0'), category, count))
+        
+        # 绘制柱状图，画布方法先取到局部变量
+        create_rectangle = self.stats_canvas.create_rectangle
+        create_text = self.stats_canvas.create_text
+        count_font = ('微软雅黑', 9, 'bold')
+        label_font = ('微软雅黑', 8)
+        label_y = canvas_height - margin + 15
+        for x0, y1, color, category, count in bars:
+            center = x0 + bar_width/2
+            # 柱状
+            create_rectangle(x0, y0, x0 + bar_width, y1, fill=color, outline='black')
+            # 数量标签
+            create_text(center, y1 - 10, text=str(count), font=count_font)
+            # 分类标签（旋转45度）
+            create_text(center, label_y, text=category, angle=45, font=label_font)
         
         # 绘制标题
         self.stats_canvas.create_text(canvas_width/2, 20, 
@@ -847,8 +1169,9 @@ class FileOrganizerGUI:
         self.files_to_process = []
         
         # 清空分类预览
-        for widget in self.category_frame.winfo_children():
-            widget.destroy()
+        self.category_canvas.delete("all")
+        self.category_items = {}
+        self.category_counts = defaultdict(int)
         
         self.log_message("文件列表已清空")
 
@@ -859,17 +1182,21 @@ class FileOrganizerGUI:
         self.log_queue.put(formatted_message)
 
     def update_log(self):
-        """更新日志显示"""
+        """更新日志显示，把队列中的消息合并成一次插入，减少Tk重绘"""
+        messages = []
         try:
             while True:
-                message = self.log_queue.get_nowait()
-                self.log_text.insert(tk.END, message + "\n")
-                self.log_text.see(tk.END)
+                messages.append(self.log_queue.get_nowait())
         except queue.Empty:
             pass
         
-        # 每100毫秒检查一次
-        self.root.after(100, self.update_log)
+        if messages:
+            self.log_text.insert(tk.END, "\n".join(messages) + "\n")
+            self.log_text.see(tk.END)
+        
+        # 扫描或整理进行中每200毫秒检查一次，积累更多消息再刷新；空闲时每100毫秒
+        delay = 200 if self.thread_running or self.scanning else 100
+        self.root.after(delay, self.update_log)
 
     def clear_log(self):
         """清空日志"""
@@ -910,4 +1237,5 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
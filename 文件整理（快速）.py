@@ -5,10 +5,32 @@
 """
 
 import os
+import sys
+import mmap
+import time
+import errno
 import shutil
+import hashlib
 import argparse
 from pathlib import Path
 from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 并行移动文件的线程数；移动是阻塞的系统调用，会释放 GIL
+MOVE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 并行遍历目录的线程数，在网络文件系统或 SSD 上可以同时等待多个目录的读取
+SCAN_WORKERS = 8
+
+# 查找重复文件时按块读取的大小，超过 DUP_MMAP_MIN_SIZE 的文件改用 mmap 读取
+DUP_CHUNK_SIZE = 1024 * 1024
+DUP_MMAP_MIN_SIZE = 4 * 1024 * 1024
+# 并行计算哈希的线程数；hashlib 处理大块数据时会释放 GIL
+HASH_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# 逐个文件的输出先攒在列表里，每攒够这么多行再一次性写到终端
+OUTPUT_BATCH_LINES = 1024
 
 # 定义文件类型分类
 FILE_CATEGORIES = {
@@ -23,13 +45,99 @@ FILE_CATEGORIES = {
     '其他': []  # 未分类文件
 }
 
+# 扩展名到分类的查找表，由 FILE_CATEGORIES 生成
+EXT_TO_CATEGORY = {ext: category for category, extensions in FILE_CATEGORIES.items() for ext in extensions}
+
+# 扩展名 -> 小写形式；不同的扩展名很少，缓存后大多数文件不必再调用 str.lower
+_lower_cache = {}
+
+def _lext(ext):
+    """返回扩展名的小写形式（带缓存）"""
+    r = _lower_cache.get(ext)
+    if r is None:
+        r = _lower_cache[ext] = ext.lower()
+    return r
+
 def get_file_category(file_extension):
     """根据文件扩展名获取分类"""
-    file_extension = file_extension.lower()
-    for category, extensions in FILE_CATEGORIES.items():
-        if file_extension in extensions:
-            return category
-    return '其他'
+    return EXT_TO_CATEGORY.get(_lext(file_extension), '其他')
+
+def _scan_one(dirpath):
+    """列出单个目录，返回 (普通文件的 DirEntry 列表, 子目录路径列表)"""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    # 在工作线程里先取一次 stat，结果由 DirEntry 缓存，后面直接使用；
+                    # 整理时会跳过的隐藏文件和系统文件不预取
+                    if entry.name[0] not in '.~':
+                        entry.stat(follow_symlinks=False)
+                    files.append(entry)
+    except OSError as e:
+        print(f"无法访问 {dirpath}: {e}")
+    return files, subdirs
+
+def _walk(dirpath):
+    """
+    用线程池并行遍历目录树，逐个返回普通文件的 DirEntry（类型和 stat 结果由 DirEntry 缓存）
+    
+    每个目录是一个独立的任务，一个目录列完后再把它的子目录提交给线程池；
+    每个目录都是先完整列出再返回，整理过程中在根目录下新建的分类文件夹不会被再次遍历
+    """
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        pending = {executor.submit(_scan_one, dirpath)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for subdir in subdirs:
+                    pending.add(executor.submit(_scan_one, subdir))
+                yield from files
+
+def _hardlink_tree(src, dst):
+    """
+    用硬链接创建目录树的备份快照
+    
+    只复制目录结构，文件通过 os.link 指向同一份数据，几乎不占额外空间；
+    无法创建硬链接时（如跨文件系统）退回 shutil.copy2
+    """
+    # 先列出源目录再创建目标目录，备份目录位于源目录内时不会把它自己也遍历进去
+    with os.scandir(src) as it:
+        entries = list(it)
+    os.makedirs(dst)
+    dst_path = os.path.abspath(dst)
+    for entry in entries:
+        if os.path.abspath(entry.path) == dst_path:
+            continue
+        target = os.path.join(dst, entry.name)
+        if entry.is_dir():
+            _hardlink_tree(entry.path, target)
+        else:
+            try:
+                os.link(entry.path, target)
+            except OSError:
+                shutil.copy2(entry.path, target)
+
+def _move_one(job):
+    """移动单个文件，返回 (是否成功, 输出消息)"""
+    src, dst, name, folder_name = job
+    try:
+        try:
+            # 目标都在源目录内，通常是同一文件系统，直接重命名即可；
+            # 目标文件名已在规划阶段去重，不会覆盖已有文件
+            os.replace(src, dst)
+        except OSError as e:
+            # 源目录下挂载了其他文件系统的子目录时才需要复制
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(src, dst)
+        return True, f"✓ 移动: {name} -> {folder_name}/"
+    except Exception as e:
+        return False, f"✗ 错误移动 {name}: {e}"
 
 def organize_files(source_dir, organize_by='type', dry_run=False, create_backup=False):
     """
@@ -51,14 +159,15 @@ def organize_files(source_dir, organize_by='type', dry_run=False, create_backup=
         print(f"错误: {source_dir} 不是目录")
         return
     
-    # 创建备份
+    # 创建备份；先解析成绝对路径，否则源目录为 '.' 时 parent 仍是它自己，备份会建在源目录里
     backup_path = None
     if create_backup:
+        source_path = source_path.resolve()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = source_path.parent / f"backup_{timestamp}"
         print(f"创建备份到: {backup_path}")
         if not dry_run:
-            shutil.copytree(source_path, backup_path)
+            _hardlink_tree(source_path, backup_path)
     
     # 统计信息
     stats = {
@@ -73,63 +182,106 @@ def organize_files(source_dir, organize_by='type', dry_run=False, create_backup=
     print(f"模拟运行: {dry_run}")
     print("-" * 50)
     
+    # 循环内只用字符串路径，避免每个文件都构造 Path 对象
+    src_root = os.fspath(source_path)
+    
+    # 逐个文件的输出行缓冲起来，避免在慢速终端上每行都同步刷新
+    out = []
+    
+    def emit(line):
+        out.append(line)
+        if len(out) >= OUTPUT_BATCH_LINES:
+            sys.stdout.write("\n".join(out) + "\n")
+            out.clear()
+    
+    # 先规划所有移动任务
+    jobs = []
+    # 目标目录 -> 其中已有及已分配的文件名，每个目录只列一次，冲突检测不再逐个 stat
+    # 文件名一律用 casefold 比较：Windows 和 macOS 默认的文件系统不区分大小写，
+    # 在区分大小写的文件系统上最多只是多加一个 _N 后缀
+    dir_contents = {}
+    # (年, 月) -> 按日期整理的目标目录，同一月份的文件不必重复格式化日期和拼接路径
+    ym_cache = {}
+    
     # 遍历源目录中的所有文件
-    for item in source_path.rglob('*'):
-        if item.is_file():
-            stats['total'] += 1
+    for entry in _walk(source_path):
+        stats['total'] += 1
+        
+        # 跳过隐藏文件和系统文件，在 stat 之前判断
+        name = entry.name
+        if name[0] in '.~':
+            continue
+        
+        # 获取文件信息；_walk 已用 is_file 确认是普通文件，stat 只取一次
+        stem, file_extension = os.path.splitext(name)
+        st = entry.stat(follow_symlinks=False)
+        
+        # 确定目标文件夹
+        if organize_by == 'date':
+            # 按日期整理：年/月
+            tm = time.localtime(st.st_mtime)
+            key = (tm.tm_year, tm.tm_mon)
+            target_dir = ym_cache.get(key)
+            if target_dir is None:
+                target_dir = ym_cache[key] = os.path.join(src_root, "按日期整理", f"{key[0]}-{key[1]:02d}")
+        else:
+            # 按类型整理
+            category = get_file_category(file_extension)
+            target_dir = os.path.join(src_root, category)
             
-            # 跳过隐藏文件和系统文件
-            if item.name.startswith('.') or item.name.startswith('~'):
-                continue
-            
-            # 获取文件信息
-            file_extension = item.suffix
-            file_size = item.stat().st_size
-            modified_time = datetime.fromtimestamp(item.stat().st_mtime)
-            
-            # 确定目标文件夹
-            if organize_by == 'date':
-                # 按日期整理：年/月
-                folder_name = modified_time.strftime("%Y-%m")
-                target_dir = source_path / "按日期整理" / folder_name
+            # 更新统计
+            if category not in stats['categories']:
+                stats['categories'][category] = 0
+            stats['categories'][category] += 1
+        
+        # 创建目标目录
+        if not dry_run:
+            os.makedirs(target_dir, exist_ok=True)
+        
+        # 处理文件名冲突
+        existing = dir_contents.get(target_dir)
+        if existing is None:
+            try:
+                existing = {n.casefold() for n in os.listdir(target_dir)}
+            except FileNotFoundError:
+                # 模拟运行时目标目录还没有创建
+                existing = set()
+            dir_contents[target_dir] = existing
+        
+        new_name = name
+        if new_name.casefold() in existing:
+            name_parts = stem.split('_')
+            if len(name_parts) > 1 and name_parts[-1].isdigit():
+                base_name = '_'.join(name_parts[:-1])
             else:
-                # 按类型整理
-                category = get_file_category(file_extension)
-                target_dir = source_path / category
-                
-                # 更新统计
-                if category not in stats['categories']:
-                    stats['categories'][category] = 0
-                stats['categories'][category] += 1
-            
-            # 创建目标目录
-            if not dry_run:
-                target_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 处理文件名冲突
-            target_file = target_dir / item.name
+                base_name = stem
             counter = 1
-            while target_file.exists():
-                name_parts = item.stem.split('_')
-                if len(name_parts) > 1 and name_parts[-1].isdigit():
-                    base_name = '_'.join(name_parts[:-1])
-                else:
-                    base_name = item.stem
-                new_name = f"{base_name}_{counter}{item.suffix}"
-                target_file = target_dir / new_name
+            new_name = f"{base_name}_{counter}{file_extension}"
+            while new_name.casefold() in existing:
                 counter += 1
-            
-            # 移动文件
-            try:
-                if dry_run:
-                    print(f"[模拟] 移动: {item.name} -> {target_dir.name}/")
+                new_name = f"{base_name}_{counter}{file_extension}"
+        existing.add(new_name.casefold())
+        target_file = os.path.join(target_dir, new_name)
+        
+        folder_name = os.path.basename(target_dir)
+        if dry_run:
+            emit(f"[模拟] 移动: {name} -> {folder_name}/")
+            stats['moved'] += 1
+        else:
+            jobs.append((entry.path, target_file, name, folder_name))
+    
+    # 用线程池并行移动文件，结果按原顺序输出
+    if jobs:
+        with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as executor:
+            for ok, message in executor.map(_move_one, jobs):
+                emit(message)
+                if ok:
+                    stats['moved'] += 1
                 else:
-                    shutil.move(str(item), str(target_file))
-                    print(f"✓ 移动: {item.name} -> {target_dir.name}/")
-                stats['moved'] += 1
-            except Exception as e:
-                print(f"✗ 错误移动 {item.name}: {e}")
-                stats['skipped'] += 1
+                    stats['skipped'] += 1
+    
+    if out:
+        sys.stdout.write("\n".join(out) + "\n")
     
     # 打印统计信息
     print("\n" + "=" * 50)
@@ -148,21 +300,51 @@ def organize_files(source_dir, organize_by='type', dry_run=False, create_backup=
     
     return stats
 
+def _hash_file(job):
+    """计算单个文件内容的 BLAKE2b 摘要，返回 (路径, 摘要)，读取失败时摘要为 None"""
+    path, size = job
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            if size >= DUP_MMAP_MIN_SIZE:
+                # 大文件用 mmap 交给内核顺序预读，整个映射直接传给 hashlib，不产生中间副本
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    h.update(mm)
+            else:
+                for chunk in iter(lambda: f.read(DUP_CHUNK_SIZE), b''):
+                    h.update(chunk)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {path}: {e}")
+        return path, None
+    return path, h.digest()
+
 def find_duplicate_files(source_dir):
-    """查找重复文件（基于文件名和大小）"""
+    """查找重复文件（先按大小分组，再比较文件内容的哈希）"""
     print(f"\n查找重复文件: {source_dir}")
     print("-" * 50)
     
-    file_dict = {}
     duplicates = []
     
-    for item in Path(source_dir).rglob('*'):
-        if item.is_file():
-            key = (item.name.lower(), item.stat().st_size)
-            if key in file_dict:
-                duplicates.append((file_dict[key], item))
-            else:
-                file_dict[key] = item
+    # 第一步：按大小分组，大小不同的文件不可能重复
+    size_buckets = defaultdict(list)
+    for entry in _walk(source_dir):
+        size_buckets[entry.stat(follow_symlinks=False).st_size].append(entry.path)
+    
+    # 第二步：只对大小相同的文件计算内容哈希，hashlib 会释放 GIL，可以多线程并行
+    jobs = [(path, size)
+            for size, paths in size_buckets.items() if len(paths) > 1
+            for path in paths]
+    if jobs:
+        first_seen = {}
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            for (path, digest), (_, size) in zip(executor.map(_hash_file, jobs), jobs):
+                if digest is None:
+                    continue
+                key = (size, digest)
+                if key in first_seen:
+                    duplicates.append((first_seen[key], path))
+                else:
+                    first_seen[key] = path
     
     if duplicates:
         print(f"找到 {len(duplicates)} 组重复文件:")
@@ -175,22 +357,41 @@ def find_duplicate_files(source_dir):
     
     return duplicates
 
+def _prune(path, removed, is_root=False):
+    """
+    自底向上删除 path 下的空文件夹，返回 path 本身是否被删除
+    
+    遍历时顺便统计剩余条目，子目录删光且没有文件的目录就是空的，不需要再列一次目录；
+    根目录本身不删除
+    """
+    remaining = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False) or not _prune(entry.path, removed):
+                    remaining += 1
+    except OSError as e:
+        print(f"无法访问 {path}: {e}")
+        return False
+    
+    if remaining or is_root:
+        return False
+    try:
+        os.rmdir(path)
+    except OSError as e:
+        print(f"无法删除 {path}: {e}")
+        return False
+    print(f"删除空文件夹: {path}")
+    removed.append(Path(path))
+    return True
+
 def cleanup_empty_folders(source_dir):
     """清理空文件夹"""
     print(f"\n清理空文件夹: {source_dir}")
     print("-" * 50)
     
     empty_folders = []
-    for root, dirs, files in os.walk(source_dir, topdown=False):
-        for dir_name in dirs:
-            dir_path = Path(root) / dir_name
-            try:
-                if not any(dir_path.iterdir()):
-                    empty_folders.append(dir_path)
-                    print(f"删除空文件夹: {dir_path}")
-                    dir_path.rmdir()
-            except Exception as e:
-                print(f"无法删除 {dir_path}: {e}")
+    _prune(source_dir, empty_folders, is_root=True)
     
     print(f"\n清理了 {len(empty_folders)} 个空文件夹")
     return empty_folders
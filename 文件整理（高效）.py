@@ -4,12 +4,63 @@
 """
 
 import os
+import errno
 import shutil
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 from datetime import datetime
 
+# 扩展名 -> 小写形式；不同的扩展名很少，缓存后大多数文件不必再调用 str.lower
+_lower_cache = {}
+
+def _lext(ext):
+    """返回扩展名的小写形式（带缓存）"""
+    r = _lower_cache.get(ext)
+    if r is None:
+        r = _lower_cache[ext] = ext.lower()
+    return r
+
+def _hardlink_tree(src, dst):
+    """
+    用硬链接创建目录树的备份快照
+    
+    只复制目录结构，文件通过 os.link 指向同一份数据，几乎不占额外空间；
+    无法创建硬链接时（如跨文件系统）退回 shutil.copy2
+    """
+    # 先列出源目录再创建目标目录，备份目录位于源目录内时不会把它自己也遍历进去
+    with os.scandir(src) as it:
+        entries = list(it)
+    os.makedirs(dst)
+    dst_path = os.path.abspath(dst)
+    for entry in entries:
+        if os.path.abspath(entry.path) == dst_path:
+            continue
+        target = os.path.join(dst, entry.name)
+        if entry.is_dir():
+            _hardlink_tree(entry.path, target)
+        else:
+            try:
+                os.link(entry.path, target)
+            except OSError:
+                shutil.copy2(entry.path, target)
+
+def _move(src, dst):
+    """
+    移动文件，同一文件系统内直接 os.rename，跨文件系统时退回 shutil.move
+    
+    目标已存在时在所有平台上都抛出 FileExistsError（POSIX 上的 os.rename 会直接覆盖），由调用方跳过该文件
+    """
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "目标文件已存在", str(dst))
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
 class SimpleFileOrganizer:
     def __init__(self, root):
         self.root = root
@@ -19,6 +70,17 @@ class SimpleFileOrganizer:
         # 变量
         self.source_dir = tk.StringVar(value=str(Path.home() / "Downloads"))
         
+        # 文件分类定义
+        self.categories = {
+            '图片': ['.jpg', '.jpeg', '.png', '.gif', '.bmp'],
+            '文档': ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx'],
+            '音频': ['.mp3', '.wav'],
+            '视频': ['.mp4', '.avi', '.mkv'],
+            '其他': []
+        }
+        # 扩展名到分类的查找表
+        self.ext_to_category = {ext: cat for cat, exts in self.categories.items() for ext in exts}
+        
         # 创建界面
         self.create_widgets()
     
@@ -90,25 +152,18 @@ class SimpleFileOrganizer:
         self.status.config(text="正在整理...")
         
         try:
-            # 文件分类定义
-            categories = {
-                '图片': ['.jpg', '.jpeg', '.png', '.gif', '.bmp'],
-                '文档': ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx'],
-                '音频': ['.mp3', '.wav'],
-                '视频': ['.mp4', '.avi', '.mkv'],
-                '其他': []
-            }
-            
             # 创建备份
             if self.create_backup.get():
-                backup_path = source_path.parent / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                # 先解析成绝对路径，保证备份建在源目录的上一级而不是源目录里
+                backup_path = source_path.resolve().parent / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 self.log(f"创建备份: {backup_path}")
-                shutil.copytree(source_path, backup_path)
+                _hardlink_tree(source_path, backup_path)
             
             count = 0
+            skipped = 0
             for item in source_path.iterdir():
                 if item.is_file():
-                    ext = item.suffix.lower()
+                    ext = _lext(item.suffix)
                     
                     if self.org_type.get() == 'date':
                         # 按日期整理
@@ -117,23 +172,26 @@ class SimpleFileOrganizer:
                         target_dir = source_path / folder_name
                     else:
                         # 按类型整理
-                        category = '其他'
-                        for cat, exts in categories.items():
-                            if ext in exts:
-                                category = cat
-                                break
+                        category = self.ext_to_category.get(ext, '其他')
                         target_dir = source_path / category
                     
                     target_dir.mkdir(exist_ok=True)
                     
-                    # 移动文件
+                    # 移动文件；单个文件失败（如目标已存在）只跳过该文件，继续整理其余文件
                     target_file = target_dir / item.name
-                    shutil.move(str(item), str(target_file))
+                    try:
+                        _move(item, target_file)
+                    except OSError as e:
+                        self.log(f"跳过: {item.name} - {e}")
+                        skipped += 1
+                        continue
                     
                     self.log(f"移动: {item.name} -> {target_dir.name}/")
                     count += 1
             
             self.log(f"\n整理完成！共处理 {count} 个文件")
+            if skipped:
+                self.log(f"跳过 {skipped} 个文件")
             self.status.config(text="整理完成")
             
         except Exception as e:
@@ -149,17 +207,9 @@ class SimpleFileOrganizer:
         self.status.config(text="正在清理空文件夹...")
         
         try:
-            count = 0
-            for root, dirs, files in os.walk(source_path, topdown=False):
-                for dir_name in dirs:
-                    dir_path = Path(root) / dir_name
-                    try:
-                        if not any(dir_path.iterdir()):
-                            dir_path.rmdir()
-                            self.log(f"删除空文件夹: {dir_path}")
-                            count += 1
-                    except:
-                        pass
+            removed = []
+            self._prune(source_path, removed, is_root=True)
+            count = len(removed)
             
             self.log(f"\n清理完成！共删除 {count} 个空文件夹")
             self.status.config(text="清理完成")
@@ -168,6 +218,27 @@ class SimpleFileOrganizer:
             self.log(f"错误: {e}")
             self.status.config(text="清理出错")
 
+    def _prune(self, path, removed, is_root=False):
+        """自底向上删除空文件夹，遍历时顺便统计剩余条目，返回 path 本身是否被删除"""
+        remaining = 0
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False) or not self._prune(entry.path, removed):
+                        remaining += 1
+        except OSError:
+            return False
+        
+        if remaining or is_root:
+            return False
+        try:
+            os.rmdir(path)
+        except OSError:
+            return False
+        self.log(f"删除空文件夹: {path}")
+        removed.append(path)
+        return True
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = SimpleFileOrganizer(root)